@@ -5,19 +5,39 @@ Serves .md files; agents call POST /refresh to signal updates; clients preserve
 from __future__ import annotations
 
 import asyncio
-import json
+import functools
+import hashlib
+import logging
 import os
 import re
 import secrets
 import sys
+import threading
+import xml.etree.ElementTree as etree
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
+from stat import S_ISREG
 from urllib.parse import urljoin, urlparse
 
 import markdown
-from fastapi import Depends, FastAPI, Header, HTTPException
-from fastapi.responses import HTMLResponse, PlainTextResponse
+import orjson
+from broadcaster import Broadcast
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.responses import FileResponse, HTMLResponse, ORJSONResponse, Response
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
+from markdown.postprocessors import Postprocessor
+from markdown.treeprocessors import Treeprocessor
 from pydantic import BaseModel
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger("md-easy")
+
+if sys.version_info < (3, 11):
+    print("Error: MD-Easy requires Python 3.11 or later.", file=sys.stderr)
+    sys.exit(1)
 
 # Port and bind host (HOST set => bind to that address and require REFRESH_API_KEY)
 PORT = int(os.environ.get("PORT", "8765"))
@@ -29,6 +49,14 @@ if HOST and not REFRESH_API_KEY:
     print("Error: REFRESH_API_KEY must be set when HOST is set (non-local binding).", file=sys.stderr)
     sys.exit(1)
 
+# TLS cert/key (env SSL_CERTFILE, SSL_KEYFILE): when set, `python server.py` serves with Hypercorn so browsers
+# can negotiate HTTP/2
+SSL_CERTFILE = (os.environ.get("SSL_CERTFILE") or "").strip()
+SSL_KEYFILE = (os.environ.get("SSL_KEYFILE") or "").strip()
+if bool(SSL_CERTFILE) != bool(SSL_KEYFILE):
+    print("Error: SSL_CERTFILE and SSL_KEYFILE must be set together.", file=sys.stderr)
+    sys.exit(1)
+
 # Base URL for doc viewer links (default http://localhost:PORT); no trailing slash
 BASE_URL = (os.environ.get("BASE_URL") or f"http://localhost:{PORT}").strip().rstrip("/")
 
@@ -41,107 +69,386 @@ if THEME not in VALID_THEMES:
     THEME = "default"
 if not DOC_ROOT.exists():
     DOC_ROOT.mkdir(parents=True, exist_ok=True)
-
-app = FastAPI(title="MD-Easy", description="MD doc server with refresh hook for agents")
-
-# SSE: when refresh is triggered, notify connected clients
-_refresh_event = asyncio.Event()
+# Refresh fan-out across worker processes (env BROADCAST_URL, e.g. redis://localhost:6379); unset = this process only
+BROADCAST_URL = (os.environ.get("BROADCAST_URL") or "").strip()
+# Max concurrent SSE streams per client IP (env MAX_SSE_PER_IP; 0 = unlimited)
+MAX_SSE_PER_IP = int(os.environ.get("MAX_SSE_PER_IP", "16"))
+
+
+class _GZipExceptStreams(GZipMiddleware):
+    """GZip responses, but pass two paths through:
+    - the SSE stream: GZipResponder buffers streamed chunks in the compressor, which would hold events back,
+      and SSE frames are too small to gain from compression;
+    - /raw/: FileResponse answers Range requests and sets an ETag, both of which describe the file's bytes,
+      not a gzipped body."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and (scope["path"] == "/api/events" or scope["path"].startswith("/raw/")):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """When BROADCAST_URL is set, share refreshes with the other workers through the broadcast channel."""
+    if not BROADCAST_URL:
+        yield
+        return
+    task = asyncio.create_task(_run_refresh_broadcast())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+
+app = FastAPI(
+    title="MD-Easy",
+    description="MD doc server with refresh hook for agents",
+    default_response_class=ORJSONResponse,
+    lifespan=_lifespan,
+)
+app.add_middleware(_GZipExceptStreams, minimum_size=1024)
+
+# SSE: when refresh is triggered, notify connected clients (they wait for the version to change,
+# so a refresh landing between waits is never missed)
+_refresh_cv = asyncio.Condition()
 _refresh_version = 0
+# Refreshes within this window (e.g. an agent writing many files) wake SSE clients once
+_REFRESH_DEBOUNCE = 0.05
+_refresh_notify_task: asyncio.Task | None = None
 _pending_navigate: dict | None = None  # {"path": str, "fragment": str | None, "highlight": bool}
-
-
-def _collect_md_files(base: Path, prefix: str = "") -> list[str]:
-    out = []
+# Cross-worker refreshes: each message carries the publishing worker's id so it can skip its own
+_broadcast: Broadcast | None = None
+_BROADCAST_CHANNEL = "md-easy-refresh"
+_WORKER_ID = secrets.token_hex(8)
+_BROADCAST_RETRY_MIN = 1.0
+_BROADCAST_RETRY_MAX = 30.0
+# Liveness check through broadcaster's public API: each worker pings the channel and reconnects when
+# nothing (not even its own ping) comes back within two intervals
+_BROADCAST_PING = "ping"
+_BROADCAST_PING_INTERVAL = 15.0
+# Open SSE streams per client IP; only touched from the event loop, with no await in between read and write
+_sse_counts: dict[str, int] = defaultdict(int)
+
+# Directory walk: thread pool used only when DOC_ROOT has at least this many top-level subdirectories
+_PARALLEL_WALK_MIN_DIRS = 8
+_WALK_WORKERS = 8
+
+# File listing memoized per refresh version: (version, files)
+_files_cache: tuple[int, list[str]] | None = None
+_files_lock = threading.Lock()
+
+
+def _scan_dir(dir_path: str, prefix: str, out: list[str], subdirs) -> None:
+    """List one directory with os.scandir (d_type from readdir, no per-entry stat): .md paths go to out,
+    (path, prefix) of subdirectories to subdirs."""
     try:
-        for p in sorted(base.iterdir()):
-            rel = f"{prefix}{p.name}" if prefix else p.name
-            if p.name.startswith(".") or p.name == "node_modules":
-                continue
-            if p.is_file() and p.suffix.lower() == ".md":
-                out.append(rel)
-            elif p.is_dir():
-                out.extend(_collect_md_files(p, f"{rel}/"))
-    except PermissionError:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                name = entry.name
+                if name.startswith(".") or name == "node_modules":
+                    continue
+                if entry.is_file():
+                    if name.lower().endswith(".md"):
+                        out.append(prefix + name)
+                elif entry.is_dir():
+                    subdirs.append((entry.path, f"{prefix}{name}/"))
+    except OSError:
         pass
+
+
+def _walk_md_files(dir_path: str, prefix: str = "") -> list[str]:
+    """Breadth-first walk of one directory tree."""
+    out: list[str] = []
+    queue = deque([(dir_path, prefix)])
+    while queue:
+        _scan_dir(*queue.popleft(), out, queue)
+    return out
+
+
+def _collect_md_files(base: Path) -> list[str]:
+    """All .md paths under base, unordered. Wide top levels are walked in parallel: readdir is I/O
+    and releases the GIL, so threads overlap directory latency."""
+    out: list[str] = []
+    subdirs: list[tuple[str, str]] = []
+    _scan_dir(str(base), "", out, subdirs)
+    if len(subdirs) < _PARALLEL_WALK_MIN_DIRS:
+        for dir_path, prefix in subdirs:
+            out.extend(_walk_md_files(dir_path, prefix))
+        return out
+    with ThreadPoolExecutor(max_workers=_WALK_WORKERS) as pool:
+        for files in pool.map(lambda d: _walk_md_files(*d), subdirs):
+            out.extend(files)
     return out
 
 
+_DOC_ROOT_STR = str(DOC_ROOT)
+_DOC_ROOT_PREFIX = os.path.join(_DOC_ROOT_STR, "")
+
+
 def _safe_path(subpath: str) -> Path:
     """Resolve path under DOC_ROOT; forbid traversal."""
     subpath = subpath.lstrip("/").replace("..", "")
-    return (DOC_ROOT / subpath).resolve()
+    full = os.path.normpath(os.path.join(_DOC_ROOT_STR, subpath))
+    # DOC_ROOT is already resolved: only components below it can be symlinks, and only then is realpath needed
+    part = full
+    while len(part) > len(_DOC_ROOT_STR):
+        if os.path.islink(part):
+            return Path(os.path.realpath(full))
+        part = os.path.dirname(part)
+    return Path(full)
 
 
 def _under_root(p: Path) -> bool:
-    return p == DOC_ROOT or DOC_ROOT in p.parents
+    s = str(p)
+    return s == _DOC_ROOT_STR or s.startswith(_DOC_ROOT_PREFIX)
 
 
-def _rewrite_md_links_in_html(html: str, current_doc_path: str, base_url: str) -> str:
-    """Rewrite relative/internal .md links to open in the doc viewer (baseUrl/#/path)."""
-    if not current_doc_path or not base_url:
-        return html
-    # Directory of current doc for resolving relative links (with trailing / for urljoin)
-    dir_part = current_doc_path.rsplit("/", 1)[0] + "/" if "/" in current_doc_path else ""
+_PASSTHROUGH_HREF_PREFIXES = ("#", "mailto:", "http://", "https://")
+_PLAIN_HREF_RE = re.compile(r"[^\x00-\x20:;?#]+")
 
-    def replace_href(m: re.Match[str]) -> str:
-        href = m.group(1)
-        if not href or href.startswith("#") or href.startswith("mailto:") or href.startswith("http://") or href.startswith("https://"):
-            return m.group(0)
+
+def _rewrite_md_href(href: str, dir_part: str, base_url: str) -> str | None:
+    """Viewer URL (baseUrl/#/path) for a relative/internal .md link; None to leave href as is."""
+    if not href or href.startswith(_PASSTHROUGH_HREF_PREFIXES):
+        return None
+    fragment = ""
+    root_relative = href.startswith("/")
+    joined = href if root_relative else dir_part + href
+    if _PLAIN_HREF_RE.fullmatch(joined) and "/." not in joined and "//" not in joined and not joined.startswith("."):
+        # Plain path (no scheme, params, query, fragment, dot or empty segments, or whitespace urlparse
+        # would strip): urlparse/urljoin would only concatenate
+        resolved = joined[1:] if root_relative else joined
+    else:
         parsed = urlparse(href)
         if parsed.scheme or parsed.netloc:
-            return m.group(0)
+            return None
         path = (parsed.path or href).lstrip("/")
         # Root-relative (e.g. /docs/foo.md) => path under doc root; else resolve relative to current doc dir
         if (parsed.path or href).startswith("/"):
             resolved = path
         else:
             resolved = urljoin(dir_part, path)
-        resolved = resolved.rstrip("/")
-        if not resolved.lower().endswith(".md"):
-            return m.group(0)
-        # Normalize: remove any query/fragment for the route; keep fragment for in-page anchor if needed
-        new_href = f"{base_url}/#/{resolved}"
-        if parsed.fragment:
-            new_href += "#" + parsed.fragment
-        return f'href="{new_href}"'
+        fragment = parsed.fragment
+    resolved = resolved.rstrip("/")
+    if not resolved.lower().endswith(".md"):
+        return None
+    # Normalize: remove any query/fragment for the route; keep fragment for in-page anchor if needed
+    new_href = f"{base_url}/#/{resolved}"
+    if fragment:
+        new_href += "#" + fragment
+    return new_href
+
+
+def _doc_dir(doc_path: str) -> str:
+    """Directory of current doc for resolving relative links (with trailing / for urljoin)."""
+    return doc_path.rsplit("/", 1)[0] + "/" if "/" in doc_path else ""
+
+
+class _MdLinkTreeprocessor(Treeprocessor):
+    """Rewrite .md links on <a> elements during rendering (no second pass over the HTML)."""
+
+    doc_path = ""  # Path of the doc being rendered; set under _md_lock before convert()
+
+    def run(self, root: etree.Element) -> None:
+        if not self.doc_path or not BASE_URL:
+            return
+        dir_part = _doc_dir(self.doc_path)
+        for a in root.iter("a"):
+            new_href = _rewrite_md_href(a.get("href", ""), dir_part, BASE_URL)
+            if new_href is not None:
+                a.set("href", new_href)
+
+
+_HREF_RE = re.compile(r'href="([^"]*)"')
 
-    return re.sub(r'href="([^"]*)"', replace_href, html)
+
+class _MdLinkRawHtmlPostprocessor(Postprocessor):
+    """Rewrite .md links in stashed raw HTML (inline/block HTML never reaches the element tree).
+    Only the stashed fragments are scanned, not the whole rendered document."""
+
+    def __init__(self, md: markdown.Markdown, links: _MdLinkTreeprocessor):
+        super().__init__(md)
+        self.links = links
+
+    def run(self, text: str) -> str:
+        if not self.links.doc_path or not BASE_URL:
+            return text
+        dir_part = _doc_dir(self.links.doc_path)
+
+        def replace_href(m: re.Match[str]) -> str:
+            new_href = _rewrite_md_href(m.group(1), dir_part, BASE_URL)
+            return m.group(0) if new_href is None else f'href="{new_href}"'
+
+        blocks = self.md.htmlStash.rawHtmlBlocks
+        for i, block in enumerate(blocks):
+            if isinstance(block, str) and 'href="' in block:
+                blocks[i] = _HREF_RE.sub(replace_href, block)
+        return text
+
+
+# One configured Markdown instance (extensions loaded once); renders run in worker threads, so guard it
+_MD = markdown.Markdown(extensions=["extra", "codehilite", "toc"])
+_md_links = _MdLinkTreeprocessor(_MD)
+# After inline (links exist) and toc; before unescape
+_MD.treeprocessors.register(_md_links, "md_links", 1)
+# Before raw_html (30) puts the stashed fragments back into the output
+_MD.postprocessors.register(_MdLinkRawHtmlPostprocessor(_MD, _md_links), "md_links_raw_html", 35)
+_md_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=512)
+def _render(full_str: str, mtime_ns: int, size: int, doc_path: str) -> tuple[str, str]:
+    """Read and render one .md file. Cached on (path, mtime, size) so unchanged docs skip parsing."""
+    raw = Path(full_str).read_text(encoding="utf-8", errors="replace")
+    with _md_lock:
+        _md_links.doc_path = doc_path
+        html = _MD.reset().convert(raw)
+    return html, raw
 
 
 @app.get("/api/config")
-def get_config():
+async def get_config():
     """Theme and client config; theme from env THEME, baseUrl for doc viewer links (default localhost)."""
     return {"theme": THEME, "baseUrl": BASE_URL}
 
 
+def _files_snapshot() -> tuple[int, list[str]]:
+    """(version, files) for the current refresh version; walks DOC_ROOT only when the cache is stale."""
+    global _files_cache
+    with _files_lock:
+        version = _refresh_version
+        if _files_cache is None or _files_cache[0] != version:
+            # Sorted once here (same order as a per-directory sorted walk), then reused until the next refresh
+            _files_cache = (version, sorted(_collect_md_files(DOC_ROOT), key=lambda rel: rel.split("/")))
+        return _files_cache
+
+
 @app.get("/api/files")
-def list_files():
-    """List all .md files under DOC_ROOT (recursive)."""
-    return {"files": _collect_md_files(DOC_ROOT), "version": _refresh_version}
+async def list_files():
+    """List all .md files under DOC_ROOT (recursive). Cached until the next refresh."""
+    snapshot = _files_cache
+    if snapshot is None or snapshot[0] != _refresh_version:
+        snapshot = await asyncio.to_thread(_files_snapshot)
+    version, files = snapshot
+    return {"files": files, "version": version}
 
 
 @app.get("/api/doc")
-def get_doc(path: str = ""):
+async def get_doc(path: str = ""):
     """Get content of one .md file. Returns HTML-rendered body and raw path for client state."""
     if not path or not path.strip():
         raise HTTPException(status_code=400, detail="path required")
     full = _safe_path(path)
-    if not full.exists() or not full.is_file():
+    try:
+        st = full.stat()
+    except OSError:
+        st = None
+    if st is None or not S_ISREG(st.st_mode):
         raise HTTPException(status_code=404, detail="file not found")
     if not _under_root(full):
         raise HTTPException(status_code=403, detail="forbidden")
-    raw = full.read_text(encoding="utf-8", errors="replace")
-    html = markdown.markdown(raw, extensions=["extra", "codehilite", "toc"])
-    html = _rewrite_md_links_in_html(html, path, BASE_URL)
+    # Read + render are blocking/CPU-bound; keep them off the event loop
+    html, raw = await asyncio.to_thread(_render, str(full), st.st_mtime_ns, st.st_size, path)
     return {"path": path, "html": html, "raw": raw}
 
 
 @app.get("/api/version")
-def get_version():
+async def get_version():
     """Current refresh version; clients poll or use SSE to detect when to refetch."""
     return {"version": _refresh_version}
 
 
+async def _notify_refresh() -> None:
+    """Wake SSE listeners once per debounce window; they pick up the latest version and navigate."""
+    global _refresh_notify_task
+    await asyncio.sleep(_REFRESH_DEBOUNCE)
+    _refresh_notify_task = None
+    async with _refresh_cv:
+        _refresh_cv.notify_all()
+
+
+async def _apply_refresh(navigate: dict | None, version: int = 0) -> None:
+    """Record a refresh (from /refresh or another worker): bump version, drop caches, wake SSE listeners.
+    version is the publisher's version; taking the max keeps workers converged on the same number."""
+    global _refresh_version, _pending_navigate, _files_cache, _refresh_notify_task
+    async with _refresh_cv:
+        _refresh_version = max(_refresh_version + 1, version)
+        # Keep the last navigate in a burst: a plain refresh within the debounce window must not drop it.
+        # SSE streams clear it once delivered.
+        if navigate is not None:
+            _pending_navigate = navigate
+        _render.cache_clear()
+        _files_cache = None
+    if _refresh_notify_task is None:
+        _refresh_notify_task = asyncio.create_task(_notify_refresh())
+
+
+async def _apply_broadcasts(subscriber) -> None:
+    """Apply refreshes published by other workers; malformed messages are logged and skipped.
+    Raises ConnectionError when nothing, not even this worker's own ping, arrives within the deadline."""
+    timeout = _BROADCAST_PING_INTERVAL * 2
+    loop = asyncio.get_running_loop()
+    try:
+        async with asyncio.timeout(timeout) as deadline:
+            async for event in subscriber:
+                deadline.reschedule(loop.time() + timeout)
+                if event.message == _BROADCAST_PING:
+                    continue
+                try:
+                    message = orjson.loads(event.message)
+                    origin, version, navigate = message["origin"], int(message["version"]), message["navigate"]
+                except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+                    logger.warning("Ignoring malformed refresh broadcast: %r", event.message)
+                    continue
+                if origin != _WORKER_ID:
+                    await _apply_refresh(navigate, version)
+    except TimeoutError:
+        raise ConnectionError(f"no refresh broadcast received for {timeout:.0f}s") from None
+
+
+async def _ping_broadcasts(broadcast: Broadcast) -> None:
+    """Publish a ping on the refresh channel, so a connection that stopped delivering is noticed."""
+    while True:
+        await broadcast.publish(_BROADCAST_CHANNEL, _BROADCAST_PING)
+        await asyncio.sleep(_BROADCAST_PING_INTERVAL)
+
+
+async def _run_refresh_broadcast() -> None:
+    """Keep this worker connected to the refresh channel, reconnecting with backoff when it fails."""
+    global _broadcast
+    delay = _BROADCAST_RETRY_MIN
+    while True:
+        broadcast = Broadcast(BROADCAST_URL)
+        try:
+            await broadcast.connect()
+            async with broadcast.subscribe(_BROADCAST_CHANNEL) as subscriber:
+                _broadcast = broadcast
+                delay = _BROADCAST_RETRY_MIN
+                tasks = {
+                    asyncio.create_task(_apply_broadcasts(subscriber)),
+                    asyncio.create_task(_ping_broadcasts(broadcast)),
+                }
+                try:
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                done.pop().result()
+                raise ConnectionError("refresh broadcast subscription ended")
+        except Exception:
+            logger.exception("Refresh broadcast channel failed; reconnecting in %.0fs", delay)
+        finally:
+            _broadcast = None
+            with suppress(Exception):
+                await broadcast.disconnect()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, _BROADCAST_RETRY_MAX)
+
+
 class RefreshBody(BaseModel):
     reason: str | None = None
     navigate_path: str | None = None
@@ -164,50 +471,78 @@ def _verify_refresh_api_key(
 
 
 @app.post("/refresh", dependencies=[Depends(_verify_refresh_api_key)])
-def refresh_hook(body: RefreshBody | None = None):
+async def refresh_hook(body: RefreshBody | None = None):
     """
     Refresh hook: call this when docs are updated (e.g. from an AI agent).
     Bumps version and wakes SSE listeners so the UI refetches while preserving
-    the user's current location unless that file was removed.
+    the user's current location unless that file was removed. Bursts of refreshes
+    are coalesced into a single SSE event.
     Optional: set navigate_path (and optionally navigate_fragment, highlight) to
     tell the viewer to open that doc/section and briefly highlight it.
     """
-    global _refresh_version, _pending_navigate
-    _refresh_version += 1
     if body and body.navigate_path and body.navigate_path.strip():
-        _pending_navigate = {
+        navigate = {
             "path": body.navigate_path.strip(),
             "fragment": (body.navigate_fragment or "").strip() or None,
             "highlight": getattr(body, "highlight", True),
         }
     else:
-        _pending_navigate = None
-    _refresh_event.set()
-    _refresh_event.clear()
+        navigate = None
+    await _apply_refresh(navigate)
+    if BROADCAST_URL:
+        # The local refresh already happened; a broker outage only costs the other workers this one
+        message = {"origin": _WORKER_ID, "version": _refresh_version, "navigate": navigate}
+        if _broadcast is None:
+            logger.warning("Refresh broadcast channel is reconnecting; other workers miss this refresh")
+        else:
+            try:
+                await _broadcast.publish(_BROADCAST_CHANNEL, orjson.dumps(message).decode())
+            except Exception:
+                logger.exception("Could not publish refresh to other workers")
     return {"ok": True, "version": _refresh_version, "reason": getattr(body, "reason", None) or ""}
 
 
+# Keep-alive frame sent when no refresh arrives within the wait timeout
+_PING_FRAME = b'data: {"ping": true}\n\n'
+
+
 @app.get("/api/events")
-async def sse_events():
+async def sse_events(request: Request):
     """Server-Sent Events: stream refresh notifications so the client can refetch without polling."""
     from fastapi.responses import StreamingResponse
 
+    client_ip = request.client.host if request.client else ""
+    if MAX_SSE_PER_IP and _sse_counts[client_ip] >= MAX_SSE_PER_IP:
+        raise HTTPException(status_code=429, detail="too many event streams from this client")
+    _sse_counts[client_ip] += 1
+
     async def stream():
         global _pending_navigate
         last = _refresh_version
-        while True:
-            try:
-                await asyncio.wait_for(_refresh_event.wait(), timeout=30.0)
-            except asyncio.TimeoutError:
-                yield f"data: {{\"ping\": true}}\n\n"
-                continue
-            if _refresh_version != last:
-                last = _refresh_version
-                payload = {"version": last}
-                if _pending_navigate is not None:
-                    payload["navigate"] = _pending_navigate
-                    _pending_navigate = None
-                yield f"data: {json.dumps(payload)}\n\n"
+        try:
+            while True:
+                try:
+                    # asyncio.timeout keeps the wait in this task; wait_for() on 3.10/3.11 could unbalance the lock on disconnect
+                    async with asyncio.timeout(30.0):
+                        async with _refresh_cv:
+                            await _refresh_cv.wait_for(lambda: _refresh_version != last)
+                            last = _refresh_version
+                            payload = {"version": last}
+                            if _pending_navigate is not None:
+                                payload["navigate"] = _pending_navigate
+                                _pending_navigate = None
+                except TimeoutError:
+                    # Idle: drop clients that went away instead of pinging them forever
+                    if await request.is_disconnected():
+                        return
+                    yield _PING_FRAME
+                    continue
+                yield b"data: " + orjson.dumps(payload) + b"\n\n"
+        finally:
+            _sse_counts[client_ip] -= 1
+            if not _sse_counts[client_ip]:
+                del _sse_counts[client_ip]
+
     return StreamingResponse(
         stream(),
         media_type="text/event-stream",
@@ -219,24 +554,69 @@ _static_dir = Path(__file__).parent / "static"
 app.mount("/themes", StaticFiles(directory=_static_dir / "themes"), name="themes")
 
 
+# The SPA is static: read it once and serve it with a validator so browsers can revalidate cheaply
+_INDEX_BYTES = (_static_dir / "index.html").read_bytes()
+_INDEX_ETAG = f'"{hashlib.blake2b(_INDEX_BYTES, digest_size=8).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored and * matches any current representation."""
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in tags}
+
+
 @app.get("/", response_class=HTMLResponse)
-def index():
+async def index(if_none_match: str | None = Header(None)):
     """Serve the single-page app."""
-    return (_static_dir / "index.html").read_text(encoding="utf-8")
+    headers = {"ETag": _INDEX_ETAG, "Cache-Control": "no-cache"}
+    if if_none_match and _etag_matches(if_none_match, _INDEX_ETAG):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=_INDEX_BYTES, headers=headers)
 
 
 # Optional: serve raw .md for debugging
-@app.get("/raw/{path:path}", response_class=PlainTextResponse)
-def raw_md(path: str):
+@app.get("/raw/{path:path}", response_class=FileResponse)
+async def raw_md(path: str):
     full = _safe_path(path)
-    if not full.exists() or not full.is_file():
+    if not full.is_file():
         raise HTTPException(status_code=404, detail="not found")
     if not _under_root(full):
         raise HTTPException(status_code=403, detail="forbidden")
-    return full.read_text(encoding="utf-8", errors="replace")
+    # Streamed from disk in chunks rather than buffered whole in memory
+    return FileResponse(full, media_type="text/plain; charset=utf-8")
 
 
 if __name__ == "__main__":
     import uvicorn
     bind_host = HOST if HOST else "127.0.0.1"
-    uvicorn.run(app, host=bind_host, port=PORT)
+    # Worker processes (env WORKERS). Refresh state lives in each process; with more than one
+    # worker set BROADCAST_URL so every worker hears each refresh.
+    workers = max(1, int(os.environ.get("WORKERS", "1")))
+    loop = "uvloop" if sys.platform != "win32" else "asyncio"
+    if SSL_CERTFILE:
+        # Browsers only speak HTTP/2 over TLS. Hypercorn negotiates h2 via ALPN, so every SSE stream and
+        # fetch from a tab shares one connection instead of hitting the ~6-per-origin HTTP/1.1 limit.
+        from hypercorn.config import Config
+        from hypercorn.run import run
+
+        # Workers import the app afresh from the environment; default links to the https origin they serve
+        os.environ.setdefault("BASE_URL", f"https://localhost:{PORT}")
+        config = Config()
+        config.bind = [f"{bind_host}:{PORT}"]
+        config.certfile = SSL_CERTFILE
+        config.keyfile = SSL_KEYFILE
+        config.alpn_protocols = ["h2", "http/1.1"]
+        config.workers = workers
+        config.worker_class = loop
+        config.application_path = "server:app"
+        sys.exit(run(config))
+    # uvicorn[standard] ships uvloop + httptools; pin them rather than relying on auto-detection
+    uvicorn.run(
+        "server:app",
+        app_dir=str(Path(__file__).parent),
+        host=bind_host,
+        port=PORT,
+        workers=workers,
+        loop=loop,
+        http="httptools",
+    )